@@ -5,32 +5,77 @@ Tracks git status, manages documentation, and repeats important context based on
 """
 
 import asyncio
+import bisect
+import functools
 import json
 import os
+import shlex
 import subprocess
+import sys
+import time
 import hashlib
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any, Set, Tuple, Union
 import logging
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from mcp.server import Server
 from mcp.types import Resource, Tool, TextContent, CallToolResult
 import tiktoken  # For token counting
 
+try:
+    import orjson  # Optional, faster JSON encoding
+except ImportError:
+    orjson = None
+
+try:
+    import watchfiles  # Optional, event-driven git status refresh
+except ImportError:
+    watchfiles = None
+
+_LOG_FILE = Path('mcp_guidelines_server.log').resolve()
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('mcp_guidelines_server.log'),
+        logging.FileHandler(_LOG_FILE),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger(__name__)
 
+# Encoding used by gpt-4; Claude uses similar tokenization
+_ENCODING_NAME = "cl100k_base"
+
+# Inputs longer than this are tokenized in slices to bound peak memory
+_TOKENIZE_CHUNK_CHARS = 1 << 20
+
+# How many upcoming repetitions get_context_summary reports
+_NEXT_REPETITIONS_LIMIT = 20
+
+# Sidecar in the guidelines directory that remembers already-loaded files
+_GUIDELINE_CACHE_NAME = ".cache.json"
+_GUIDELINE_CACHE_VERSION = 4
+
+# Entries under .git whose changes can affect `git status`
+_GIT_WATCHED_ENTRIES = {"HEAD", "index", "refs", "packed-refs"}
 
-@dataclass
+# Group bursts of file-system events (e.g. a checkout) into one refresh
+_WATCH_DEBOUNCE_MS = 500
+
+# Fallback refresh interval when watchfiles isn't installed (seconds)
+_GIT_POLL_INTERVAL = 30
+
+# Space-separated fields before the path in porcelain v2 entries, by entry type
+_PORCELAIN_V2_FIELDS = {"1": 8, "2": 9, "u": 10}
+
+# Printed between commands in a batched git invocation
+_BATCH_SEPARATOR = "---SEP---"
+
+
+@dataclass(slots=True)
 class ContextItem:
     """Represents a piece of context with priority and token tracking."""
     id: str
@@ -39,11 +84,14 @@ class ContextItem:
     category: str  # 'guideline', 'state', 'documentation'
     last_shown_at_token: int = 0
     repeat_after_tokens: int = 5000  # Default repeat interval
-    created_at: str = ""
+    created_at: int = 0  # Unix seconds
+    token_count: int = 0  # Tokens in content, computed once when added
     
     def __post_init__(self):
+        # Only a handful of categories exist; share one string per category
+        self.category = sys.intern(self.category)
         if not self.created_at:
-            self.created_at = datetime.now().isoformat()
+            self.created_at = int(time.time())
 
 
 class GitTracker:
@@ -55,111 +103,327 @@ class GitTracker:
     def get_status(self) -> Dict[str, Any]:
         """Get comprehensive git status."""
         try:
+            porcelain, remotes, log_lines, stash_lines = self._run_git_batch([
+                ["status", "--porcelain=v2", "--branch"],
+                ["remote", "-v"],
+                ["log", "-5", "--oneline", "--decorate"],
+                ["stash", "list"],
+            ])
+            branch, short_status, staged, unstaged = self._parse_porcelain_v2(porcelain)
+            
             status = {
                 "timestamp": datetime.now().isoformat(),
-                "branch": self._get_current_branch(),
-                "status": self._get_status_output(),
-                "recent_commits": self._get_recent_commits(5),
-                "uncommitted_changes": self._get_diff_stats(),
-                "remotes": self._get_remotes(),
-                "stash_count": self._get_stash_count()
+                "branch": branch,
+                "status": "\n".join(short_status),
+                "recent_commits": self._decode_lines(log_lines),
+                "uncommitted_changes": {
+                    "staged_files": staged,
+                    "unstaged_files": unstaged
+                },
+                "remotes": self._decode_lines(remotes),
+                "stash_count": len(stash_lines)
             }
             return status
         except Exception as e:
             logger.error(f"Error getting git status: {e}")
             return {"error": str(e)}
     
-    def _run_git_command(self, args: List[str]) -> str:
-        """Run a git command and return output."""
+    def _run_git_batch(self, commands: List[List[str]]) -> List[List[bytes]]:
+        """Run several git commands in a single shell and return each one's lines.
+
+        Forking one shell per refresh instead of one git process per query
+        keeps the periodic status update cheap. Each command is followed by a
+        sentinel line carrying its exit status, and a RuntimeError is raised
+        if any of them failed. Output is left as raw bytes; callers decode
+        only the lines they report.
+        """
+        if os.name == "nt":
+            # cmd.exe expands %errorlevel% when the line is parsed, not per
+            # command, so report success or failure through && / ||
+            suffix = f" && echo {_BATCH_SEPARATOR} 0 || echo {_BATCH_SEPARATOR} 1"
+            joiner = " & "
+            quote = subprocess.list2cmdline
+        else:
+            suffix = f"; echo {_BATCH_SEPARATOR} $?"
+            joiner = "; "
+            quote = shlex.join
+        script = joiner.join(quote(["git"] + args) + suffix for args in commands)
+        
         try:
             result = subprocess.run(
-                ["git"] + args,
+                script,
                 cwd=self.repo_path,
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=30,  # 5 second timeout to prevent hanging
-                shell=True
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=30,  # 30 second timeout to prevent hanging
+                shell=True,
+                # Keep `git status` from rewriting .git/index, which would
+                # wake the file watcher again
+                env={**os.environ, "GIT_OPTIONAL_LOCKS": "0"}
             )
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            return f"Error: {e.stderr}"
         except subprocess.TimeoutExpired:
-            return f"Error: Git command timed out"
-    
-    def _get_current_branch(self) -> str:
-        return self._run_git_command(["branch", "--show-current"])
-    
-    def _get_status_output(self) -> str:
-        return self._run_git_command(["status", "--short"])
-    
-    def _get_recent_commits(self, count: int) -> List[str]:
-        output = self._run_git_command(
-            ["log", f"-{count}", "--oneline", "--decorate"]
-        )
-        return output.split('\n') if output else []
-    
-    def _get_diff_stats(self) -> Dict[str, int]:
-        staged = self._run_git_command(["diff", "--cached", "--numstat"])
-        unstaged = self._run_git_command(["diff", "--numstat"])
+            raise RuntimeError("Git command timed out")
         
-        stats = {
-            "staged_files": len(staged.split('\n')) if staged else 0,
-            "unstaged_files": len(unstaged.split('\n')) if unstaged else 0
-        }
-        return stats
+        separator = _BATCH_SEPARATOR.encode()
+        sections: List[List[bytes]] = []
+        current: List[bytes] = []
+        exit_codes: List[bytes] = []
+        for line in result.stdout.splitlines():
+            if line.startswith(separator):
+                sections.append(current)
+                current = []
+                exit_codes.append(line[len(separator):].strip())
+            elif line:
+                current.append(line)
+        
+        # A missing sentinel means the shell died before running that command
+        failed = [
+            " ".join(commands[i])
+            for i in range(len(commands))
+            if i >= len(exit_codes) or exit_codes[i] != b"0"
+        ]
+        if failed:
+            stderr = result.stderr.decode("utf-8", "replace").strip()
+            raise RuntimeError(f"git {', git '.join(failed)} failed: {stderr}")
+        return sections
     
-    def _get_remotes(self) -> List[str]:
-        output = self._run_git_command(["remote", "-v"])
-        return output.split('\n') if output else []
+    @staticmethod
+    def _parse_porcelain_v2(lines: List[bytes]) -> Tuple[str, List[str], int, int]:
+        """Parse `git status --porcelain=v2 --branch` output.
+
+        Returns the current branch ("" when detached), `status --short` style
+        lines, and the number of files with staged and with unstaged changes.
+        """
+        branch = ""
+        short_status: List[str] = []
+        staged = unstaged = 0
+        for raw_line in lines:
+            line = raw_line.decode("utf-8", "replace")
+            kind = line[0]
+            if kind == "#":
+                if line.startswith("# branch.head "):
+                    head = line[len("# branch.head "):]
+                    branch = "" if head == "(detached)" else head
+            elif kind in _PORCELAIN_V2_FIELDS:
+                xy = line[2:4]
+                path = line.split(" ", _PORCELAIN_V2_FIELDS[kind])[-1]
+                if kind == "2":
+                    # Renames and copies end in "<path>\t<origPath>"
+                    new_path, orig_path = path.split("\t", 1)
+                    orig_path = GitTracker._quote_short_path(orig_path)
+                    new_path = GitTracker._quote_short_path(new_path)
+                    path = f"{orig_path} -> {new_path}"
+                else:
+                    path = GitTracker._quote_short_path(path)
+                if kind == "u":
+                    # Unmerged paths show up in both the index and worktree diffs
+                    staged += 1
+                    unstaged += 1
+                else:
+                    staged += xy[0] != "."
+                    unstaged += xy[1] != "."
+                short_status.append(f"{xy.replace('.', ' ')} {path}")
+            elif kind == "?":
+                short_status.append(f"?? {GitTracker._quote_short_path(line[2:])}")
+        return branch, short_status, staged, unstaged
+    
+    @staticmethod
+    def _quote_short_path(path: str) -> str:
+        """Quote a porcelain v2 path the way `git status --short` prints it.
+
+        v2 already C-quotes paths with control characters, quotes,
+        backslashes or (under core.quotePath) non-ASCII bytes. The short
+        format additionally quotes paths containing spaces, which never
+        need escaping themselves.
+        """
+        if " " in path and not path.startswith('"'):
+            return f'"{path}"'
+        return path
     
-    def _get_stash_count(self) -> int:
-        output = self._run_git_command(["stash", "list"])
-        return len(output.split('\n')) if output else 0
+    @staticmethod
+    def _decode_lines(lines: List[bytes]) -> List[str]:
+        return [line.decode("utf-8", "replace") for line in lines]
+
+
+def _dumps_json(obj: Any) -> str:
+    """Serialize to indented JSON, using orjson when it's installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=2)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_encoder(encoding_name: str) -> tiktoken.Encoding:
+    """Load a tiktoken encoding once per process.
+
+    Building the BPE rank table is slow, so every ContextManager shares it.
+    """
+    return tiktoken.get_encoding(encoding_name)
 
 
 class ContextManager:
     """Manages context items with token-based repetition."""
     
+    # Contexts at or above this priority are always active
+    HIGH_PRIORITY = 8
+    
     def __init__(self, repeat_threshold: int = 5000):
         self.contexts: Dict[str, ContextItem] = {}
         self.token_counter = 0
         self.repeat_threshold = repeat_threshold
-        self.tokenizer = tiktoken.encoding_for_model("gpt-4")  # Claude uses similar tokenization
+        self.tokenizer = _get_encoder(_ENCODING_NAME)
+        # Secondary indices, kept in sync by add_context/remove_context
+        self._high_priority_ids: Set[str] = set()
+        self._by_category: Dict[str, int] = {}
+        # Every (next_due_token, context_id), kept sorted; the due contexts
+        # are always a prefix of it
+        self._schedule: List[Tuple[int, str]] = []
+        # Last rendered active-context markdown, keyed by the ids it contains
+        self._rendered_active: Optional[Tuple[Tuple[str, ...], str]] = None
         
     def add_context(self, context: ContextItem) -> None:
-        """Add or update a context item."""
+        """Add or update a context item.
+
+        Doesn't tokenize; callers set `token_count` beforehand, off the
+        event loop where the content can be large.
+        """
+        self._rendered_active = None
+        previous = self.contexts.get(context.id)
+        if previous is not None:
+            self._unindex(previous)
+            self._unschedule(previous)
         self.contexts[context.id] = context
+        if context.priority >= self.HIGH_PRIORITY:
+            self._high_priority_ids.add(context.id)
+        self._by_category[context.category] = self._by_category.get(context.category, 0) + 1
+        bisect.insort(self._schedule, (self._next_due(context), context.id))
         
     def remove_context(self, context_id: str) -> bool:
         """Remove a context item."""
         if context_id in self.contexts:
-            del self.contexts[context_id]
+            self._rendered_active = None
+            context = self.contexts.pop(context_id)
+            self._unindex(context)
+            self._unschedule(context)
             return True
         return False
     
+    def _unindex(self, context: ContextItem) -> None:
+        self._high_priority_ids.discard(context.id)
+        
+        remaining = self._by_category[context.category] - 1
+        if remaining:
+            self._by_category[context.category] = remaining
+        else:
+            del self._by_category[context.category]
+    
+    def _unschedule(self, context: ContextItem) -> None:
+        entry = (self._next_due(context), context.id)
+        i = bisect.bisect_left(self._schedule, entry)
+        if i < len(self._schedule) and self._schedule[i] == entry:
+            del self._schedule[i]
+        else:
+            # The caller changed the schedule fields of a stored context
+            # before re-adding it; find its entry by id instead
+            self._schedule = [e for e in self._schedule if e[1] != context.id]
+    
+    @staticmethod
+    def _next_due(context: ContextItem) -> int:
+        return context.last_shown_at_token + context.repeat_after_tokens
+    
+    def _due_end(self) -> int:
+        """Length of the _schedule prefix that is due at the current token count."""
+        return bisect.bisect_right(
+            self._schedule, self.token_counter, key=lambda entry: entry[0]
+        )
+    
     def get_active_contexts(self) -> List[ContextItem]:
         """Get contexts that should be shown based on token count."""
-        active = []
-        for context in self.contexts.values():
-            tokens_since_shown = self.token_counter - context.last_shown_at_token
-            if tokens_since_shown >= context.repeat_after_tokens:
-                active.append(context)
-                context.last_shown_at_token = self.token_counter
+        due_end = self._due_end()
+        due = [self.contexts[context_id] for _, context_id in self._schedule[:due_end]]
+        active_ids = {context.id for context in due}
         
         # Always include high-priority items
-        for context in self.contexts.values():
-            if context.priority >= 8 and context not in active:
-                active.append(context)
+        active = due + [
+            self.contexts[context_id]
+            for context_id in self._high_priority_ids - active_ids
+        ]
+        
+        # Reschedule only once both passes are done, and only the items that
+        # were actually due; dropping the whole prefix first also keeps
+        # zero-interval items from being picked up twice
+        del self._schedule[:due_end]
+        for context in due:
+            context.last_shown_at_token = self.token_counter
+            bisect.insort(self._schedule, (self._next_due(context), context.id))
         
         # Sort by priority
         return sorted(active, key=lambda x: x.priority, reverse=True)
     
-    def increment_tokens(self, text: str) -> None:
-        """Increment token counter based on text."""
-        tokens = len(self.tokenizer.encode(text))
+    def render_active_contexts(self) -> str:
+        """Render the active contexts as one markdown document.
+
+        The rendering is reused while the same contexts stay active; any
+        add or remove invalidates it.
+        """
+        active_contexts = self.get_active_contexts()
+        key = tuple(ctx.id for ctx in active_contexts)
+        if self._rendered_active is not None and self._rendered_active[0] == key:
+            return self._rendered_active[1]
+        
+        combined_text = "\n\n---\n\n".join([
+            f"# {ctx.id} (Priority: {ctx.priority})\n\n{ctx.content}"
+            for ctx in active_contexts
+        ])
+        self._rendered_active = (key, combined_text)
+        return combined_text
+    
+    def increment_tokens(self, text: str) -> int:
+        """Increment token counter based on text and return the tokens added."""
+        return self.add_tokens(self.count_tokens(text))
+    
+    def add_tokens(self, tokens: int) -> int:
+        """Advance the token counter by an already-counted amount."""
         self.token_counter += tokens
         logger.info(f"Token counter: {self.token_counter} (+{tokens})")
+        return tokens
+    
+    def count_tokens(self, text: Union[str, bytes]) -> int:
+        """Count tokens without materializing one token list for the whole text.
+
+        UTF-8 `bytes` are tokenized as-is, so callers holding raw file or
+        payload bytes don't need to decode them first. Doesn't touch manager
+        state, so it is safe to call from a worker thread.
+        """
+        if isinstance(text, bytes):
+            encode, space = self._encode_utf8, b" "
+        else:
+            encode, space = self.tokenizer.encode_ordinary, " "
+        
+        if len(text) <= _TOKENIZE_CHUNK_CHARS:
+            return len(encode(text))
+        
+        total = 0
+        start = 0
+        while start < len(text):
+            end = start + _TOKENIZE_CHUNK_CHARS
+            if end < len(text):
+                # Cut before a space so no token straddles two slices; a space
+                # byte never occurs inside a multi-byte UTF-8 sequence
+                split = text.rfind(space, start + 1, end)
+                if split != -1:
+                    end = split
+            total += len(encode(text[start:end]))
+            start = end
+        return total
+    
+    def _encode_utf8(self, data: bytes) -> List[int]:
+        # Encoding._encode_bytes hands the bytes straight to the Rust BPE;
+        # older tiktoken releases without it get a decode first
+        encode_bytes = getattr(self.tokenizer, "_encode_bytes", None)
+        if encode_bytes is not None:
+            return encode_bytes(data)
+        return self.tokenizer.encode_ordinary(data.decode("utf-8", "replace"))
     
     def get_context_summary(self) -> Dict[str, Any]:
         """Get summary of all contexts."""
@@ -167,31 +431,31 @@ class ContextManager:
             "total_contexts": len(self.contexts),
             "current_token_count": self.token_counter,
             "contexts_by_category": self._group_by_category(),
+            "total_tokens_in_active_contexts": self._active_token_count(),
             "next_repetitions": self._get_next_repetitions()
         }
     
+    def _active_token_count(self) -> int:
+        """Tokens the next active-context read would show, without marking anything shown."""
+        active_ids = {context_id for _, context_id in self._schedule[:self._due_end()]}
+        active_ids |= self._high_priority_ids
+        return sum(self.contexts[context_id].token_count for context_id in active_ids)
+    
     def _group_by_category(self) -> Dict[str, int]:
-        groups = {}
-        for context in self.contexts.values():
-            groups[context.category] = groups.get(context.category, 0) + 1
-        return groups
+        return dict(self._by_category)
     
     def _get_next_repetitions(self) -> List[Dict[str, Any]]:
-        """Get when contexts will next be repeated."""
-        repetitions = []
-        for context in self.contexts.values():
-            tokens_until_repeat = (
-                context.last_shown_at_token + 
-                context.repeat_after_tokens - 
-                self.token_counter
-            )
-            if tokens_until_repeat > 0:
-                repetitions.append({
-                    "id": context.id,
-                    "tokens_until_repeat": tokens_until_repeat,
-                    "priority": context.priority
-                })
-        return sorted(repetitions, key=lambda x: x['tokens_until_repeat'])
+        """Get when the soonest contexts will next be repeated."""
+        counter = self.token_counter
+        start = self._due_end()
+        return [
+            {
+                "id": context_id,
+                "tokens_until_repeat": next_due - counter,
+                "priority": self.contexts[context_id].priority
+            }
+            for next_due, context_id in self._schedule[start:start + _NEXT_REPETITIONS_LIMIT]
+        ]
 
 
 class GuidelinesServer:
@@ -216,27 +480,131 @@ class GuidelinesServer:
         asyncio.create_task(self._update_git_status_periodically())
     
     def _load_guidelines(self) -> None:
-        """Load guidelines from the guidelines directory."""
-        for file_path in self.guidelines_dir.glob("*.md"):
-            content = file_path.read_text()
-            context_id = f"guideline_{file_path.stem}"
+        """Load guidelines from the guidelines directory.
+
+        Files whose size and mtime (or content hash) match the on-disk cache
+        reuse the cached context instead of being rebuilt.
+        """
+        cache_path = self.guidelines_dir / _GUIDELINE_CACHE_NAME
+        cache = self._read_guideline_cache(cache_path)
+        new_cache: Dict[str, Dict[str, Any]] = {}
+        
+        # scandir hands back cached stat data with each entry, avoiding a
+        # separate stat() and Path object per file
+        with os.scandir(self.guidelines_dir) as entries:
+            guideline_files = [
+                e for e in entries
+                if e.name.endswith(".md") and e.is_file()
+            ]
+        
+        for file_entry in guideline_files:
+            stat = file_entry.stat()
+            entry = cache.get(file_entry.name)
+            context = None
             
-            # Determine priority from filename or content
-            priority = 5  # Default
-            if "critical" in file_path.stem.lower():
-                priority = 10
-            elif "important" in file_path.stem.lower():
-                priority = 8
-                
-            context = ContextItem(
-                id=context_id,
-                content=content,
-                priority=priority,
-                category="guideline",
-                repeat_after_tokens=3000 if priority >= 8 else 5000
-            )
+            if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+                digest = entry.get("hash")
+                context = self._context_from_cache(entry)
+            
+            if context is None:
+                with open(file_entry.path, "rb") as f:
+                    raw = f.read()
+                digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+                if entry and entry.get("hash") == digest:
+                    context = self._context_from_cache(entry)
+                if context is None:
+                    content = raw.decode("utf-8")
+                    if "\r" in content:
+                        # Match the universal-newline handling of read_text()
+                        content = content.replace("\r\n", "\n").replace("\r", "\n")
+                        token_source: Union[str, bytes] = content
+                    else:
+                        token_source = raw
+                    context = self._build_guideline(file_entry.name[:-3], content)
+                    # Count once here so the count is cached with the context
+                    context.token_count = self.context_manager.count_tokens(token_source)
+            
+            new_cache[file_entry.name] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "hash": digest,
+                "context": asdict(context)
+            }
             self.context_manager.add_context(context)
-            logger.info(f"Loaded guideline: {file_path.name}")
+            logger.info(f"Loaded guideline: {file_entry.name}")
+        
+        if new_cache != cache:
+            self._write_guideline_cache(cache_path, new_cache)
+    
+    @staticmethod
+    def _build_guideline(stem: str, content: str) -> ContextItem:
+        # Determine priority from filename or content
+        priority = 5  # Default
+        lowered = stem.lower()
+        if "critical" in lowered:
+            priority = 10
+        elif "important" in lowered:
+            priority = 8
+            
+        return ContextItem(
+            id=f"guideline_{stem}",
+            content=content,
+            priority=priority,
+            category="guideline",
+            repeat_after_tokens=3000 if priority >= 8 else 5000
+        )
+    
+    @staticmethod
+    def _context_from_cache(entry: Dict[str, Any]) -> Optional[ContextItem]:
+        try:
+            return ContextItem(**entry["context"])
+        except (KeyError, TypeError):
+            return None
+    
+    @staticmethod
+    def _read_guideline_cache(cache_path: Path) -> Dict[str, Dict[str, Any]]:
+        try:
+            data = json.loads(cache_path.read_text())
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable guideline cache: {e}")
+            return {}
+        if not isinstance(data, dict) or data.get("version") != _GUIDELINE_CACHE_VERSION:
+            return {}
+        files = data.get("files")
+        return files if isinstance(files, dict) else {}
+    
+    @staticmethod
+    def _write_guideline_cache(cache_path: Path, files: Dict[str, Dict[str, Any]]) -> None:
+        """Write the cache atomically so a crash never leaves a torn file."""
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        try:
+            GuidelinesServer._ignore_guideline_cache(cache_path, tmp_path)
+            tmp_path.write_text(json.dumps({
+                "version": _GUIDELINE_CACHE_VERSION,
+                "files": files
+            }))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write guideline cache: {e}")
+    
+    @staticmethod
+    def _ignore_guideline_cache(cache_path: Path, tmp_path: Path) -> None:
+        """Keep the cache out of `git status` in the user's project.
+
+        Writes a .gitignore next to the cache unless one already exists. It
+        lists itself too, so it shows up nowhere unless the user adds it.
+        """
+        gitignore = cache_path.with_name(".gitignore")
+        try:
+            with open(gitignore, "x") as f:
+                f.write(
+                    "# Written by the guidelines server; local cache files only\n"
+                    f"{cache_path.name}\n{tmp_path.name}\n.gitignore\n"
+                )
+        except FileExistsError:
+            pass
     
     def _setup_handlers(self) -> None:
         """Set up MCP server handlers."""
@@ -276,16 +644,12 @@ class GuidelinesServer:
             if uri == "git://status":
                 status = self.git_tracker.get_status()
                 return TextContent(
-                    text=json.dumps(status, indent=2),
+                    text=_dumps_json(status),
                     mimeType="application/json"
                 )
             
             elif uri == "context://active":
-                active_contexts = self.context_manager.get_active_contexts()
-                combined_text = "\n\n---\n\n".join([
-                    f"# {ctx.id} (Priority: {ctx.priority})\n\n{ctx.content}"
-                    for ctx in active_contexts
-                ])
+                combined_text = self.context_manager.render_active_contexts()
                 return TextContent(
                     text=combined_text or "No active contexts to show currently.",
                     mimeType="text/markdown"
@@ -372,6 +736,9 @@ class GuidelinesServer:
                     category=arguments.get("category", "guideline"),
                     repeat_after_tokens=arguments.get("repeat_after_tokens", 5000)
                 )
+                context.token_count = await asyncio.to_thread(
+                    self.context_manager.count_tokens, context.content
+                )
                 self.context_manager.add_context(context)
                 
                 # Optionally save to file
@@ -393,37 +760,26 @@ class GuidelinesServer:
                 )
             
             elif name == "track_tokens":
-                self.context_manager.increment_tokens(arguments["text"])
+                # Encode in a worker thread so large texts don't stall the event
+                # loop; the counter itself is only updated from the loop
+                tokens = await asyncio.to_thread(
+                    self.context_manager.count_tokens, arguments["text"]
+                )
+                self.context_manager.add_tokens(tokens)
                 return CallToolResult(
-                    content=[TextContent(
-                        type="text",
-                        text=f"Tracked {len(self.context_manager.tokenizer.encode(arguments['text']))} tokens"
-                    )]
+                    content=[TextContent(type="text", text=f"Tracked {tokens} tokens")]
                 )
             
             elif name == "get_context_summary":
                 summary = self.context_manager.get_context_summary()
                 return CallToolResult(
-                    content=[TextContent(type="text", text=json.dumps(summary, indent=2))]
+                    content=[TextContent(type="text", text=_dumps_json(summary))]
                 )
             
             elif name == "force_refresh":
                 try:
                     logger.info("Starting force_refresh")
-                    # Update git status
-                    git_status = self.git_tracker.get_status()
-                    logger.info("Got git status")
-
-                    # Create/update git status context
-                    git_context = ContextItem(
-                        id="git_status",
-                        content=json.dumps(git_status, indent=2),
-                        priority=6,
-                        category="state",
-                        repeat_after_tokens=2000
-                    )
-                    self.context_manager.add_context(git_context)
-                    logger.info("Added git context")
+                    await self._refresh_git_status()
 
                     return CallToolResult(
                         content=[TextContent(type="text", text="Refreshed git status and contexts")]
@@ -439,23 +795,75 @@ class GuidelinesServer:
             )
     
     async def _update_git_status_periodically(self) -> None:
-        """Update git status every 30 seconds."""
-        while True:
-            await asyncio.sleep(30)
+        """Update git status whenever the repository changes.
+
+        Falls back to polling every 30 seconds if watchfiles isn't installed
+        or the watcher can't be started.
+        """
+        async for _ in self._git_change_events():
             try:
-                git_status = self.git_tracker.get_status()
-                git_context = ContextItem(
-                    id="git_status",
-                    content=json.dumps(git_status, indent=2),
-                    priority=6,
-                    category="state",
-                    repeat_after_tokens=2000  # Show git status more frequently
-                )
-                self.context_manager.add_context(git_context)
-                logger.info("Updated git status")
+                await self._refresh_git_status()
             except Exception as e:
                 logger.error(f"Error updating git status: {e}")
     
+    async def _git_change_events(self) -> AsyncIterator[None]:
+        """Yield whenever the git status may have changed."""
+        if watchfiles is not None:
+            # The watcher only fires on changes; take the initial snapshot now
+            yield
+            try:
+                async for _ in watchfiles.awatch(
+                    self.project_path,
+                    watch_filter=self._should_watch,
+                    debounce=_WATCH_DEBOUNCE_MS
+                ):
+                    yield
+            except Exception as e:
+                logger.error(f"File watcher failed, polling instead: {e}")
+        
+        while True:
+            await asyncio.sleep(_GIT_POLL_INTERVAL)
+            yield
+    
+    def _should_watch(self, change: Any, path: str) -> bool:
+        """Only wake for changes that can alter the git status."""
+        file_path = Path(path)
+        if file_path in (_LOG_FILE, self.guidelines_dir / _GUIDELINE_CACHE_NAME):
+            return False
+        try:
+            parts = file_path.relative_to(self.project_path).parts
+        except ValueError:
+            return True
+        if "__pycache__" in parts:
+            return False
+        if ".git" in parts:
+            git_parts = parts[parts.index(".git") + 1:]
+            return (
+                bool(git_parts)
+                and git_parts[0] in _GIT_WATCHED_ENTRIES
+                and not git_parts[-1].endswith(".lock")
+            )
+        return True
+    
+    async def _refresh_git_status(self) -> None:
+        """Replace the git_status context with a fresh snapshot.
+
+        Errors propagate; callers decide how to report them.
+        """
+        git_status = self.git_tracker.get_status()
+        git_context = ContextItem(
+            id="git_status",
+            content=_dumps_json(git_status),
+            priority=6,
+            category="state",
+            repeat_after_tokens=2000  # Show git status more frequently
+        )
+        git_context.token_count = await asyncio.to_thread(
+            self.context_manager.count_tokens, git_context.content
+        )
+        self.context_manager.add_context(git_context)
+        logger.info("Updated git status")
+    
     async def run(self) -> None:
         """Run the MCP server."""
         from mcp.server.stdio import stdio_server
@@ -471,8 +879,6 @@ class GuidelinesServer:
 
 async def main():
     """Main entry point."""
-    import sys
-    
     # Get project path from command line or use current directory
     project_path = sys.argv[1] if len(sys.argv) > 1 else "."
     
@@ -4,38 +4,48 @@ Install and setup script for MCP Guidelines Server with Claude Code
 """
 
 import os
+import shutil
 import sys
 import subprocess
 from pathlib import Path
 
 
+# Resolve the CLI once; on Windows this finds claude.cmd via PATHEXT, so no
+# shell is needed to locate it
+CLAUDE_CLI = shutil.which("claude") or "claude"
+
+
 def setup_mcp_server():
     """Install and configure the MCP Guidelines Server for Claude Code."""
     
     print("=== MCP Guidelines Server Setup for Claude Code ===\n")
     
     # 1. Check Python version
-    if sys.version_info < (3, 8):
-        print("❌ Python 3.8 or higher is required")
+    if sys.version_info < (3, 10):
+        print("❌ Python 3.10 or higher is required")
         return False
     print("✅ Python version OK")
     
     # 2. Install dependencies
     print("\n📦 Installing dependencies...")
     packages = ["mcp", "tiktoken"]
-    for package in packages:
-        try:
-            subprocess.run(
-                [sys.executable, "-m", "pip", "install", package],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            print(f"✅ {package} installed")
-        except subprocess.CalledProcessError:
-            print(f"❌ Failed to install {package}")
-            print(f"   Please run: pip install {package}")
-            return False
+    try:
+        # One pip run resolves all packages together
+        subprocess.run(
+            [
+                sys.executable, "-m", "pip", "install",
+                "--disable-pip-version-check", "--no-input",
+                *packages
+            ],
+            check=True,
+            capture_output=True,
+            text=True
+        )
+        print(f"✅ {', '.join(packages)} installed")
+    except subprocess.CalledProcessError:
+        print(f"❌ Failed to install {', '.join(packages)}")
+        print(f"   Please run: pip install {' '.join(packages)}")
+        return False
     
     # 3. Create guidelines directory
     project_path = Path.cwd()
@@ -56,7 +66,7 @@ def setup_mcp_server():
     
     # Build the claude mcp add command
     cmd = [
-        "claude", "mcp", "add", 
+        CLAUDE_CLI, "mcp", "add", 
         "guidelines",  # server name
         "--scope", "local",  # project-specific
         "--",  # separator
@@ -68,7 +78,7 @@ def setup_mcp_server():
     print(f"Running: {' '.join(cmd)}")
     
     try:
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=5, shell=True)
+        result = subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=5)
         print("✅ Server added to Claude Code successfully!")
         if result.stdout:
             print(result.stdout)
@@ -142,11 +152,10 @@ def check_claude_code():
     """Check if Claude Code CLI is available."""
     try:
         result = subprocess.run(
-            ["claude", "--version"],
+            [CLAUDE_CLI, "--version"],
             capture_output=True,
             text=True,
-            timeout=5,
-            shell=True  # Windows may need shell=True to find claude in PATH
+            timeout=5
         )
         return result.returncode == 0
     except Exception as e: